@@ -1,4 +1,4 @@
 # career_agent/__init__.py
-from .agent import chat, build_system_prompt
+from .agent import chat, build_persona_prompt, build_context_prompt
 
-__all__ = ["chat", "build_system_prompt"]
\ No newline at end of file
+__all__ = ["chat", "build_persona_prompt", "build_context_prompt"]
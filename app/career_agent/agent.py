@@ -1,14 +1,19 @@
 # career_agent.py
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
 import os
+import threading
+from collections import OrderedDict
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List
 
-import requests
+import httpx
+import orjson
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from pypdf import PdfReader
 import gradio as gr
 
@@ -20,15 +25,31 @@ load_dotenv(override=True)
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# Cap the history forwarded to the API so input tokens (and prefill latency)
+# stay bounded as a session grows. One turn = user message + assistant reply.
+MAX_HISTORY_TURNS = int(os.getenv("MAX_HISTORY_TURNS", "12"))
+
+# Hard cap on tool iterations per user turn; a misbehaving model can otherwise
+# loop forever generating tool calls, pinning a worker and running up cost.
+MAX_TOOL_TURNS = int(os.getenv("MAX_TOOL_TURNS", "6"))
+
 # Optional Pushover (won’t crash if missing)
 PUSHOVER_USER = os.getenv("PUSHOVER_USER")
 PUSHOVER_TOKEN = os.getenv("PUSHOVER_TOKEN")
 PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
 
+# Notifications are skipped entirely (no payload, no logging) when credentials
+# are missing or PUSH_ENABLED=0, e.g. in local dev or offline environments.
+_PUSH_ENABLED = bool(PUSHOVER_USER and PUSHOVER_TOKEN) and os.getenv("PUSH_ENABLED", "1") != "0"
+
 # Content files
 PROFILE_PDF = Path("me/profile.pdf")
 SUMMARY_TXT = Path("me/summary.txt")
 
+# Queue of questions the agent couldn't answer; consumed offline by
+# career_agent.batch through the OpenAI Batch API.
+UNKNOWN_QUESTIONS_JSONL = Path("me/unknown_questions.jsonl")
+
 # Persona
 NAME = "Carlos Vallejo"
 
@@ -37,32 +58,98 @@ NAME = "Carlos Vallejo"
 # Utilities
 # =========================
 
-def push(message: str) -> None:
-    """Send a Pushover notification if credentials exist; otherwise just print."""
+# Shared async HTTP client for Pushover; keeps the Gradio event loop free and
+# keep-alive reuses the TCP+TLS connection across notifications instead of
+# paying a fresh handshake per push.
+_HTTP = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=4, max_connections=8),
+    timeout=httpx.Timeout(10.0),
+)
+
+
+async def push(message: str) -> None:
+    """Send a Pushover notification, unless notifications are disabled."""
+    if not _PUSH_ENABLED:
+        return  # Silently ignore if not configured/enabled
     print(f"[Push] {message}")
-    if not (PUSHOVER_USER and PUSHOVER_TOKEN):
-        return  # Silently ignore if not configured
     try:
         payload = {"user": PUSHOVER_USER, "token": PUSHOVER_TOKEN, "message": message}
-        requests.post(PUSHOVER_URL, data=payload, timeout=10)
-    except requests.RequestException as e:
+        await _HTTP.post(PUSHOVER_URL, data=payload)
+    except httpx.HTTPError as e:
         print(f"[Push][WARN] Failed to send pushover: {e}")
 
 
+# Strong refs so fire-and-forget tasks aren't garbage-collected mid-flight.
+_PUSH_TASKS: set[asyncio.Task] = set()
+
+
+def _on_push_done(task: asyncio.Task) -> None:
+    _PUSH_TASKS.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc:
+        print(f"[Push][WARN] Notification task failed: {exc}")
+
+
+def push_in_background(message: str) -> None:
+    """
+    Schedule push() without awaiting it. Nobody consumes the notification
+    result, so there is no reason to keep a network RTT on the tool path.
+    """
+    if not _PUSH_ENABLED:
+        return  # Don't even schedule a task
+    task = asyncio.create_task(push(message))
+    _PUSH_TASKS.add(task)
+    task.add_done_callback(_on_push_done)
+
+
 def read_pdf_text(path: Path) -> str:
-    """Extract text from a PDF, safely."""
+    """
+    Extract text from a PDF, safely.
+
+    The result is cached next to the PDF (e.g. me/profile.cache.txt) keyed by
+    the source mtime, so a fresh process (reload, deploy) skips the PdfReader
+    work at cold start. The cache file starts with one signature line.
+    """
     if not path.exists():
         print(f"[IO][WARN] PDF not found at: {path}")
         return ""
+    sig = str(path.stat().st_mtime_ns)
+    cache_path = path.with_suffix(".cache.txt")
+    try:
+        if cache_path.exists():
+            cached_sig, _, cached_text = cache_path.read_text(encoding="utf-8").partition("\n")
+            if cached_sig == sig:
+                return cached_text
+    except Exception as e:
+        print(f"[IO][WARN] Could not read cache {cache_path}: {e}")
+
     text_all: List[str] = []
+    extracted_ok = True
     try:
+        # Sequential on purpose: pypdf shares one stream across pages, so
+        # threaded extraction races on the file position and corrupts output.
         reader = PdfReader(str(path))
         for page in reader.pages:
             page_text = page.extract_text() or ""
             text_all.append(page_text)
     except Exception as e:
         print(f"[PDF][WARN] Could not read {path}: {e}")
-    return "\n".join(text_all).strip()
+        extracted_ok = False
+    text = "\n".join(text_all).strip()
+
+    # Only cache clean extractions; a one-off failure must stay retryable
+    # instead of being served as empty text on every restart.
+    if extracted_ok:
+        try:
+            # Write-then-rename so a crash never leaves a half-written cache
+            tmp_path = cache_path.with_suffix(".cache.txt.tmp")
+            tmp_path.write_text(f"{sig}\n{text}", encoding="utf-8")
+            tmp_path.replace(cache_path)
+        except Exception as e:
+            print(f"[IO][WARN] Could not write cache {cache_path}: {e}")
+    return text
 
 
 def read_text_file(path: Path) -> str:
@@ -81,15 +168,25 @@ def read_text_file(path: Path) -> str:
 # Tool Implementations
 # =========================
 
-def record_user_details(email: str, name: str = "Name not provided", notes: str = "not provided") -> Dict[str, str]:
+async def record_user_details(email: str, name: str = "Name not provided", notes: str = "not provided") -> Dict[str, str]:
     """Record user’s contact details (demo: send a push & return ok)."""
-    push(f"Recording interest from {name} with email {email} and notes {notes}")
+    push_in_background(f"Recording interest from {name} with email {email} and notes {notes}")
     return {"recorded": "ok"}
 
 
-def record_unknown_question(question: str) -> Dict[str, str]:
+def _append_unknown_question(question: str) -> None:
+    """Persist an unanswered question so the batch job can pick it up later."""
+    try:
+        with UNKNOWN_QUESTIONS_JSONL.open("a", encoding="utf-8") as f:
+            f.write(orjson.dumps({"question": question}).decode() + "\n")
+    except Exception as e:
+        print(f"[IO][WARN] Could not record unknown question: {e}")
+
+
+async def record_unknown_question(question: str) -> Dict[str, str]:
     """Record a question the agent couldn’t answer (demo: send a push & return ok)."""
-    push(f"Recording '{question}' asked that I couldn't answer")
+    push_in_background(f"Recording '{question}' asked that I couldn't answer")
+    _append_unknown_question(question)
     return {"recorded": "ok"}
 
 
@@ -128,24 +225,40 @@ RECORD_UNKNOWN_QUESTION_SCHEMA = {
     },
 }
 
-TOOLS = [
+# Frozen: built once at import and shared by every request. The tuple hints
+# immutability so nothing (including SDK helpers) mutates or copies it.
+TOOLS = (
     {"type": "function", "function": RECORD_USER_DETAILS_SCHEMA},
     {"type": "function", "function": RECORD_UNKNOWN_QUESTION_SCHEMA},
-]
+)
 
 
 # =========================
 # LLM Client
 # =========================
 
-openai = OpenAI()
+# Explicit pooled transport: under .queue(default_concurrency_limit=8) many
+# completions run at once, and generous keep-alive limits let them all reuse
+# warm connections to api.openai.com instead of re-handshaking TLS.
+_OPENAI_HTTP = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+
+openai = AsyncOpenAI(http_client=_OPENAI_HTTP)
 
 
 # =========================
 # Prompt Assembly
 # =========================
 
-def build_system_prompt(name: str, summary: str, linkedin_text: str) -> str:
+# The PDF and summary are static files; parse them once at import instead of
+# re-extracting the whole PDF on every chat turn.
+_LINKEDIN_TEXT = read_pdf_text(PROFILE_PDF)
+_SUMMARY = read_text_file(SUMMARY_TXT)
+
+def build_persona_prompt(name: str) -> str:
+    """Instructions-only block: persona, tone, and tool-usage rules."""
     prompt = (
         f"You are acting as {name}. You are answering questions on {name}'s website, "
         f"particularly questions related to {name}'s career, background, skills and experience. "
@@ -157,93 +270,266 @@ def build_system_prompt(name: str, summary: str, linkedin_text: str) -> str:
         f"If the user is engaging in discussion, try to steer them towards getting in touch via email; ask for their email and name "
         f"and record it using your record_user_details tool. "
         f"Before calling the record_user_details tool, ask for the user's email address and name together."
-        f"\n\n## Summary:\n{summary}\n\n## LinkedIn Profile:\n{linkedin_text}\n\n"
+    )
+    return prompt
+
+
+def build_context_prompt(name: str, summary: str, linkedin_text: str) -> str:
+    """CV context block: summary + LinkedIn text, kept separate from the persona."""
+    prompt = (
+        f"## Summary:\n{summary}\n\n## LinkedIn Profile:\n{linkedin_text}\n\n"
         f"With this context, please chat with the user, always staying in character as {name}."
     )
     return prompt
 
 
+# Both blocks are byte-identical across turns and sit strictly before the
+# history, so providers can serve their tokens from the prompt prefix cache.
+# Keep anything volatile (dates, per-request data) out of these and in a user
+# turn instead.
+_PERSONA_PROMPT = build_persona_prompt(NAME)
+_CONTEXT_PROMPT = build_context_prompt(NAME, _SUMMARY, _LINKEDIN_TEXT)
+
+# Frozen prefix: the same two dicts are shared by every request, so starting a
+# conversation only costs one shallow list copy.
+_SYSTEM_PREFIX: tuple = (
+    {"role": "system", "content": _PERSONA_PROMPT},
+    {"role": "system", "content": _CONTEXT_PROMPT},
+)
+
+
+def _get_system_prefix() -> tuple:
+    """
+    Return the frozen (persona, context) system messages.
+
+    If a content file was missing at import, retry reading it here so a
+    summary/PDF added later is picked up without a restart; once both are
+    loaded this is a plain attribute read.
+    """
+    global _SUMMARY, _LINKEDIN_TEXT, _CONTEXT_PROMPT, _SYSTEM_PREFIX
+    if not _SUMMARY or not _LINKEDIN_TEXT:
+        summary = _SUMMARY or read_text_file(SUMMARY_TXT)
+        linkedin_text = _LINKEDIN_TEXT or read_pdf_text(PROFILE_PDF)
+        if summary != _SUMMARY or linkedin_text != _LINKEDIN_TEXT:
+            _SUMMARY, _LINKEDIN_TEXT = summary, linkedin_text
+            _CONTEXT_PROMPT = build_context_prompt(NAME, _SUMMARY, _LINKEDIN_TEXT)
+            _SYSTEM_PREFIX = (
+                {"role": "system", "content": _PERSONA_PROMPT},
+                {"role": "system", "content": _CONTEXT_PROMPT},
+            )
+    return _SYSTEM_PREFIX
+
+
 # =========================
 # Tool Call Handling
 # =========================
 
-def handle_tool_calls(tool_calls: Any) -> List[Dict[str, Any]]:
+async def _run_tool_call(tc: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a single tool call and wrap its result as a tool message."""
+    tool_name = tc["function"]["name"]
+    raw_args = tc["function"]["arguments"]
+    # No-arg calls are common; skip the JSON parser entirely for them
+    if not raw_args or raw_args == "{}":
+        args: Dict[str, Any] = {}
+    else:
+        args = orjson.loads(raw_args)
+    print(f"[Tool] {tool_name}({args})")
+
+    func = TOOL_DISPATCH.get(tool_name)
+    if not func:
+        print(f"[Tool][WARN] No handler for tool '{tool_name}'")
+        result: Dict[str, Any] = {"error": f"unknown tool {tool_name}"}
+    else:
+        try:
+            result = await func(**args)
+        except TypeError as e:
+            # Argument mismatch, surface helpful detail
+            result = {"error": f"bad arguments for {tool_name}: {e}"}
+        except Exception as e:
+            result = {"error": f"tool {tool_name} failed: {e}"}
+
+    return {
+        "role": "tool",
+        "content": orjson.dumps(result).decode(),
+        "tool_call_id": tc["id"],
+    }
+
+
+async def handle_tool_calls(tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Execute tool calls returned by the model and return tool messages
     that can be appended to the conversation.
+
+    The calls are independent, so run them concurrently: latency becomes
+    max(tool_i) instead of sum when several tools hit the network.
     """
-    results: List[Dict[str, Any]] = []
-    for tc in tool_calls:
-        tool_name = tc.function.name
-        raw_args = tc.function.arguments or "{}"
-        args = json.loads(raw_args)
-        print(f"[Tool] {tool_name}({args})")
-
-        func = TOOL_DISPATCH.get(tool_name)
-        if not func:
-            print(f"[Tool][WARN] No handler for tool '{tool_name}'")
-            result: Dict[str, Any] = {"error": f"unknown tool {tool_name}"}
-        else:
-            try:
-                result = func(**args)
-            except TypeError as e:
-                # Argument mismatch, surface helpful detail
-                result = {"error": f"bad arguments for {tool_name}: {e}"}
-            except Exception as e:
-                result = {"error": f"tool {tool_name} failed: {e}"}
-
-        results.append(
-            {
+    results = await asyncio.gather(
+        *(_run_tool_call(tc) for tc in tool_calls),
+        return_exceptions=True,
+    )
+    messages: List[Dict[str, Any]] = []
+    for tc, res in zip(tool_calls, results):
+        if isinstance(res, BaseException):
+            # e.g. malformed JSON arguments; keep the tool_call_id paired up
+            res = {
                 "role": "tool",
-                "content": json.dumps(result),
-                "tool_call_id": tc.id,
+                "content": orjson.dumps({"error": f"tool {tc['function']['name']} failed: {res}"}).decode(),
+                "tool_call_id": tc["id"],
             }
-        )
-    return results
+        messages.append(res)
+    return messages
 
 
 # =========================
 # Chat Loop (for Gradio)
 # =========================
 
-def chat(message: str, history: List[Dict[str, str]]) -> str:
+# Recent assistant replies keyed by (history tail, normalized message); demo
+# visitors ask the same questions ("what are your skills?") over and over, and
+# a hit costs zero tokens and zero latency. Tool turns are never cached.
+_REPLY_CACHE: OrderedDict[str, str] = OrderedDict()
+_REPLY_CACHE_MAX = 256
+
+
+def _reply_cache_key(message: str, history: List[Dict[str, str]]) -> str:
+    """Hash the normalized message plus the last two turns of history."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(message.strip().lower().encode("utf-8"))
+    for m in history[-4:]:
+        h.update(f"\x00{m['role']}\x00{m['content']}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _stitch_tool_call_delta(tool_calls: List[Dict[str, Any]], delta_tc: Any) -> None:
+    """Merge one streamed tool_call delta into the accumulated call dicts."""
+    while len(tool_calls) <= delta_tc.index:
+        tool_calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+    slot = tool_calls[delta_tc.index]
+    if delta_tc.id:
+        slot["id"] = delta_tc.id
+    if delta_tc.function:
+        if delta_tc.function.name:
+            slot["function"]["name"] += delta_tc.function.name
+        if delta_tc.function.arguments:
+            slot["function"]["arguments"] += delta_tc.function.arguments
+
+
+async def chat(message: str, history: List[Dict[str, str]]) -> AsyncIterator[str]:
     """
-    Gradio expects a function (message, history) -> reply string.
-    We keep a simple tool loop until the model returns a normal message.
+    Gradio chat function as an async generator: we stream the completion and
+    yield the running reply, so the user sees tokens at first-token time
+    instead of waiting for the whole response. Tool turns are assembled from
+    the streamed deltas, executed, and the loop starts a fresh stream.
     """
-    # Load dynamic content once per request (fast enough; can be lifted to module scope if static)
-    linkedin_text = read_pdf_text(PROFILE_PDF)
-    summary = read_text_file(SUMMARY_TXT)
-    system_prompt = build_system_prompt(NAME, summary, linkedin_text)
-
     #lets print history
     print("History:")
     for h in history:
         print(f"{h['role']}: {h['content']}")
     print(f"User message: {message}")
 
-    messages: List[Dict[str, str]] = [{"role": "system", "content": system_prompt}]
-    # Gradio passes history as [{"role": "user"/"assistant", "content": "..."}]
-    messages.extend(history)
+    cache_key = _reply_cache_key(message, history)
+    cached_reply = _REPLY_CACHE.get(cache_key)
+    if cached_reply is not None:
+        _REPLY_CACHE.move_to_end(cache_key)
+        print("[Cache] Serving cached reply")
+        yield cached_reply
+        return
+
+    # Static persona + context prefix first, then the conversation.
+    messages: List[Dict[str, str]] = list(_get_system_prefix())
+    # Gradio passes history as [{"role": "user"/"assistant", "content": "..."}];
+    # only forward the most recent turns. islice avoids materializing the
+    # slice as an intermediate list.
+    messages.extend(islice(history, max(0, len(history) - 2 * MAX_HISTORY_TURNS), None))
     messages.append({"role": "user", "content": message})
 
-    while True:
-        response = openai.chat.completions.create(
+    # The same messages list is appended to in-place across tool iterations —
+    # never rebuilt — so each loop pass only pays for the new entries.
+    used_tools = False
+    seen_calls: Dict[tuple, int] = {}
+    for _ in range(MAX_TOOL_TURNS):
+        stream = await openai.chat.completions.create(
             model=OPENAI_MODEL,
             messages=messages,
             tools=TOOLS,
+            stream=True,
         )
-        choice = response.choices[0]
-        finish_reason = choice.finish_reason
 
-        if finish_reason == "tool_calls":
+        content = ""
+        tool_calls: List[Dict[str, Any]] = []
+        finish_reason = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+            delta = choice.delta
+            if delta is None:
+                continue
+            if delta.content:
+                content += delta.content
+                yield content
+            for delta_tc in delta.tool_calls or []:
+                _stitch_tool_call_delta(tool_calls, delta_tc)
+
+        if finish_reason == "tool_calls" and tool_calls:
             # Let’s execute and append tool results; then continue the loop
-            model_msg = choice.message
-            tool_calls = model_msg.tool_calls or []
-            results = handle_tool_calls(tool_calls)
-            messages.append({"role": "assistant", "content": model_msg.content or "", "tool_calls": tool_calls})
+            used_tools = True
+            repeated = False
+            for tc in tool_calls:
+                call_key = (tc["function"]["name"], tc["function"]["arguments"])
+                seen_calls[call_key] = seen_calls.get(call_key, 0) + 1
+                if seen_calls[call_key] > 2:
+                    repeated = True
+            results = await handle_tool_calls(tool_calls)
+            # Omit content entirely when empty: no wasted prefill bytes and a
+            # byte-stable prefix for the provider's prompt cache.
+            asst: Dict[str, Any] = {"role": "assistant", "tool_calls": tool_calls}
+            if content:
+                asst["content"] = content
+            messages.append(asst)
             messages.extend(results)
+            if repeated:
+                messages.append({
+                    "role": "system",
+                    "content": "You have repeated the same tool call several times. Stop calling tools and answer the user directly.",
+                })
             continue
 
-        # Normal message
-        return choice.message.content or ""
+        # Normal message; make sure at least one yield reaches Gradio
+        if content and not used_tools:
+            _REPLY_CACHE[cache_key] = content
+            while len(_REPLY_CACHE) > _REPLY_CACHE_MAX:
+                _REPLY_CACHE.popitem(last=False)
+        if not content:
+            yield ""
+        return
+
+    # Iteration cap reached without a normal reply
+    print(f"[Chat][WARN] Gave up after {MAX_TOOL_TURNS} tool turns")
+    yield "Lo siento, no pude completar la consulta."
+
+
+# =========================
+# Startup Warmup
+# =========================
+
+def _warmup_openai() -> None:
+    """
+    Pay the DNS + TCP + TLS handshake to api.openai.com before the first user
+    arrives (typically 300-800 ms). Runs on a daemon thread with a short-lived
+    sync client — the async client's pool belongs to Gradio's event loop and
+    can't be primed from here, but the OS DNS cache and the lazy SDK/SSL setup
+    this triggers are shared.
+    """
+    try:
+        with httpx.Client(timeout=httpx.Timeout(10.0, connect=5.0)) as client:
+            OpenAI(http_client=client).models.list()
+        print("[Warmup] OpenAI connection warmed")
+    except Exception as e:
+        # Missing API key, offline, etc. — never let warmup break import
+        print(f"[Warmup][WARN] OpenAI warmup failed: {e}")
+
+
+threading.Thread(target=_warmup_openai, daemon=True).start()
@@ -0,0 +1,149 @@
+# career_agent/batch.py
+"""
+Offline answering of recorded unknown questions via the OpenAI Batch API.
+
+Nothing here is latency-critical, so we trade the 24h completion window for
+half-price tokens: the questions queued by record_unknown_question are written
+as a batch JSONL, uploaded, answered with the same persona/context prompts the
+live agent uses, and the results appended to an FAQ file the owner can review.
+
+Run from the app directory:
+    python -m career_agent.batch
+"""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from openai import OpenAI
+
+from .agent import OPENAI_MODEL, UNKNOWN_QUESTIONS_JSONL, _get_system_prefix
+
+FAQ_MD = Path("me/faq.md")
+BATCH_INPUT_JSONL = Path("/tmp/unknown.jsonl")
+POLL_INTERVAL_S = 60
+
+# Sync client on purpose: this is a standalone polling script, not the chat path.
+openai = OpenAI()
+
+
+def load_unknown_questions(path: Path = UNKNOWN_QUESTIONS_JSONL) -> List[str]:
+    """Read the queued questions, dropping blanks and duplicates."""
+    if not path.exists():
+        return []
+    questions: List[str] = []
+    seen: set[str] = set()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            question = json.loads(line).get("question", "").strip()
+        except json.JSONDecodeError:
+            continue
+        if question and question.lower() not in seen:
+            seen.add(question.lower())
+            questions.append(question)
+    return questions
+
+
+def write_batch_input(questions: List[str], path: Path = BATCH_INPUT_JSONL) -> Path:
+    """Write one /v1/chat/completions request per question in batch JSONL format."""
+    prompt_messages = _get_system_prefix()
+    with path.open("w", encoding="utf-8") as f:
+        for i, question in enumerate(questions):
+            request = {
+                "custom_id": f"unknown-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": OPENAI_MODEL,
+                    "messages": [*prompt_messages, {"role": "user", "content": question}],
+                },
+            }
+            f.write(json.dumps(request) + "\n")
+    return path
+
+
+def append_faq(answers: Dict[str, str], path: Path = FAQ_MD) -> None:
+    """Append question/answer pairs to the FAQ markdown file."""
+    with path.open("a", encoding="utf-8") as f:
+        for question, answer in answers.items():
+            f.write(f"## {question}\n\n{answer}\n\n")
+
+
+def prune_answered_questions(answered: List[str], path: Path = UNKNOWN_QUESTIONS_JSONL) -> None:
+    """
+    Drop answered questions from the queue so reruns don't re-upload (and
+    re-pay for) them. Questions recorded while the batch was running, or
+    that came back without an answer, stay queued for the next run.
+    """
+    if not path.exists():
+        return
+    answered_lower = {q.lower() for q in answered}
+    remaining: List[str] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            question = json.loads(line).get("question", "").strip()
+        except json.JSONDecodeError:
+            continue
+        if question and question.lower() not in answered_lower:
+            remaining.append(line)
+    tmp_path = path.with_suffix(".jsonl.tmp")
+    tmp_path.write_text("".join(f"{line}\n" for line in remaining), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def run_batch(poll_interval_s: int = POLL_INTERVAL_S) -> None:
+    """Upload queued questions, wait for the batch, and append answers to the FAQ."""
+    questions = load_unknown_questions()
+    if not questions:
+        print("[Batch] No unknown questions recorded; nothing to do")
+        return
+
+    input_path = write_batch_input(questions)
+    print(f"[Batch] Uploading {len(questions)} questions from {input_path}")
+    with input_path.open("rb") as f:
+        batch_file = openai.files.create(file=f, purpose="batch")
+    batch = openai.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    print(f"[Batch] Created {batch.id}; polling every {poll_interval_s}s")
+
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval_s)
+        batch = openai.batches.retrieve(batch.id)
+        print(f"[Batch] Status: {batch.status}")
+
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"[Batch][WARN] Batch finished with status '{batch.status}'")
+        return
+
+    answers: Dict[str, str] = {}
+    for line in openai.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            result = json.loads(line)
+            index = int(result["custom_id"].rsplit("-", 1)[1])
+            content = result["response"]["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, ValueError) as e:
+            print(f"[Batch][WARN] Skipping malformed result line: {e}")
+            continue
+        if content:
+            answers[questions[index]] = content
+
+    append_faq(answers)
+    prune_answered_questions(list(answers))
+    print(f"[Batch] Appended {len(answers)} answers to {FAQ_MD}")
+
+
+if __name__ == "__main__":
+    run_batch()
@@ -7,6 +7,11 @@ if __name__ == "__main__":
         type="messages",
         title="Agente de carrera de Carlos Vallejo",
         description="Pregúntame sobre la experiencia, habilidades y proyectos de Carlos.",
+    ).queue(
+        # Overlap OpenAI round-trips across sessions; chat is async so each
+        # concurrent request costs ~0 threads.
+        default_concurrency_limit=8,
+        max_size=64,
     ).launch(share=True)
 
 # cd app